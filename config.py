@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Optional
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -7,6 +8,8 @@ from logging.config import dictConfig
 DEFAULT_HOST = '0.0.0.0'
 DEFAULT_PORT = 8080
 DEFAULT_LOG_LEVEL = 'INFO'
+DEFAULT_DOWNLOAD_CONCURRENCY = 8
+DEFAULT_ATTACHMENT_CACHE_TTL = 30
 
 class Settings(BaseSettings):
     # Server settings
@@ -42,6 +45,18 @@ class Settings(BaseSettings):
         description='Logging level'
     )
 
+    MCP_DOWNLOAD_CONCURRENCY: int = Field(
+        default=DEFAULT_DOWNLOAD_CONCURRENCY,
+        description='Maximum number of attachments downloaded in parallel',
+        gt=0
+    )
+
+    MCP_ATTACHMENT_CACHE_TTL: float = Field(
+        default=DEFAULT_ATTACHMENT_CACHE_TTL,
+        description='Seconds to reuse a page attachment listing (0 disables)',
+        ge=0
+    )
+
     # Confluence settings
     CONFLUENCE_URL: str = Field(
         default='',
@@ -58,7 +73,8 @@ class Settings(BaseSettings):
         env_file_encoding='utf-8',
         case_sensitive=False,
         extra='ignore',
-        validate_default=True,
+        # Defaults are known-good constants; only env-supplied values need validating
+        validate_default=False,
     )
 
     @field_validator('LOG_LEVEL')
@@ -87,11 +103,17 @@ class Settings(BaseSettings):
             v = v.rstrip('/')
         return v
 
-try:
-    settings = Settings()
-except Exception as e:
-    print(f"Configuration error: {e}")
-    raise
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once and return the same instance on later calls."""
+    try:
+        return Settings()
+    except Exception as e:
+        print(f"Configuration error: {e}")
+        raise
+
+
+settings = get_settings()
 
 logging_config = {
     'version': 1,
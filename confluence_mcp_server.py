@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 """MCP Server for Confluence Attachment Operations."""
 
+import functools
 import logging
-import logging.config
 import os
 import sys
 import uvicorn
@@ -12,21 +12,46 @@ from starlette.routing import Route
 from starlette.responses import JSONResponse
 from starlette.endpoints import HTTPEndpoint
 
-from config import settings, logging_config
+from config import get_settings
 from confluence_client import ConfluenceAttachmentClient
 
-# Configure logging
-logging.config.dictConfig(logging_config)
+# Logging is configured once when config is imported
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Fail fast on missing Confluence configuration instead of on the first tool call
+if not settings.CONFLUENCE_URL:
+    raise ValueError("CONFLUENCE_URL environment variable not set")
+if not settings.CONFLUENCE_PERSONAL_TOKEN:
+    raise ValueError("CONFLUENCE_PERSONAL_TOKEN environment variable not set")
 
 # Create MCP server instance
 mcp = FastMCP("Confluence Attachments MCP")
 
 
-def log(message: str, level: str = "info"):
-    """Helper function for consistent logging."""
-    log_func = getattr(logger, level.lower(), logger.info)
-    log_func(message)
+_LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+
+def log(message: str, level: str = "info", *args):
+    """Helper function for consistent logging.
+
+    Formatting of ``message`` with ``args`` is deferred until the record is
+    known to be emitted.
+    """
+    lvl = _LOG_LEVELS.get(level.lower(), logging.INFO)
+    if logger.isEnabledFor(lvl):
+        logger.log(lvl, message, *args)
+
+
+# Detect the Docker container once: /output is mounted there and we run
+# from /app (the container's WORKDIR)
+_DOCKER_OUTPUT_PREFIX = '/output' if (os.path.exists('/output') and os.getcwd() == '/app') else None
 
 
 def resolve_output_path(path: str) -> str:
@@ -41,30 +66,22 @@ def resolve_output_path(path: str) -> str:
     Returns:
         Resolved absolute path appropriate for the environment
     """
-    # If path is already absolute, use it as-is
-    if os.path.isabs(path):
+    # Absolute paths, and any path outside Docker, are used as provided
+    if os.path.isabs(path) or _DOCKER_OUTPUT_PREFIX is None:
         return path
 
-    # Check if we're in a Docker container by seeing if /output exists
-    # and we're running from /app (the container's WORKDIR)
-    if os.path.exists('/output') and os.getcwd() == '/app':
-        # Prepend /output/ to relative paths
-        return os.path.join('/output', path)
-
-    # For local development, use the path as provided (relative to current directory)
-    return path
-
+    # Prepend /output/ to relative paths
+    return os.path.join(_DOCKER_OUTPUT_PREFIX, path)
 
-def get_confluence_client():
-    """Get configured Confluence client."""
-    if not settings.CONFLUENCE_URL:
-        raise ValueError("CONFLUENCE_URL environment variable not set")
-    if not settings.CONFLUENCE_PERSONAL_TOKEN:
-        raise ValueError("CONFLUENCE_PERSONAL_TOKEN environment variable not set")
 
+@functools.lru_cache(maxsize=1)
+def get_confluence_client() -> ConfluenceAttachmentClient:
+    """Get the shared Confluence client, reusing its HTTP session across tool calls."""
     return ConfluenceAttachmentClient(
         settings.CONFLUENCE_URL,
-        settings.CONFLUENCE_PERSONAL_TOKEN
+        settings.CONFLUENCE_PERSONAL_TOKEN,
+        max_workers=settings.MCP_DOWNLOAD_CONCURRENCY,
+        cache_ttl=settings.MCP_ATTACHMENT_CACHE_TTL
     )
 
 
@@ -85,6 +102,7 @@ def get_confluence_client():
             - title: Attachment filename
             - mediaType: MIME type
             - fileSize: Size in bytes
+            - kind: 1 for images, 2 for draw.io diagrams, 0 otherwise
             - isImage: Boolean indicating if it's an image
             - isDiagram: Boolean indicating if it's a draw.io diagram
     """)
@@ -92,7 +110,7 @@ def list_attachments(page_id: str):
     """List all attachments for a Confluence page."""
     page_id = str(page_id)
 
-    log(f"Listing attachments for page {page_id}")
+    log("Listing attachments for page %s", "info", page_id)
 
     try:
         client = get_confluence_client()
@@ -104,15 +122,8 @@ def list_attachments(page_id: str):
             "count": len(attachments),
             "attachments": attachments
         }
-    except ValueError as e:
-        log(f"Configuration error: {str(e)}", "error")
-        return {
-            "status": "error",
-            "error": "configuration_error",
-            "message": str(e)
-        }
     except Exception as e:
-        log(f"Error listing attachments: {str(e)}", "error")
+        log("Error listing attachments: %s", "error", e)
         return {
             "status": "error",
             "error": "api_error",
@@ -138,7 +149,7 @@ def get_attachment_metadata(page_id: str, attachment_id: str):
     page_id = str(page_id)
     attachment_id = str(attachment_id)
 
-    log(f"Getting metadata for attachment {attachment_id} on page {page_id}")
+    log("Getting metadata for attachment %s on page %s", "info", attachment_id, page_id)
 
     try:
         client = get_confluence_client()
@@ -155,15 +166,8 @@ def get_attachment_metadata(page_id: str, attachment_id: str):
             "status": "success",
             "attachment": metadata
         }
-    except ValueError as e:
-        log(f"Configuration error: {str(e)}", "error")
-        return {
-            "status": "error",
-            "error": "configuration_error",
-            "message": str(e)
-        }
     except Exception as e:
-        log(f"Error getting attachment metadata: {str(e)}", "error")
+        log("Error getting attachment metadata: %s", "error", e)
         return {
             "status": "error",
             "error": "api_error",
@@ -185,11 +189,11 @@ def get_attachment_metadata(page_id: str, attachment_id: str):
         download_diagrams (bool): Whether to download draw.io diagrams (default: True)
 
     Returns:
-        dict: Status and list of download results for each attachment
+        dict: Status and list of download results for each matching attachment
     """)
-def download_all_attachments(page_id: str, output_dir: str,
-                            download_images: bool = True,
-                            download_diagrams: bool = True):
+async def download_all_attachments(page_id: str, output_dir: str,
+                                  download_images: bool = True,
+                                  download_diagrams: bool = True):
     """Download all attachments from a Confluence page."""
     page_id = str(page_id)
     output_dir = str(output_dir)
@@ -197,20 +201,30 @@ def download_all_attachments(page_id: str, output_dir: str,
     # Resolve the output directory for Docker environment
     resolved_output_dir = resolve_output_path(output_dir)
 
-    log(f"Downloading attachments from page {page_id} to {output_dir}")
-    log(f"Resolved path: {resolved_output_dir}")
-    log(f"Filters - images: {download_images}, diagrams: {download_diagrams}")
+    log("Downloading attachments from page %s to %s", "info", page_id, output_dir)
+    log("Resolved path: %s", "info", resolved_output_dir)
+    log("Filters - images: %s, diagrams: %s", "info", download_images, download_diagrams)
 
     try:
         client = get_confluence_client()
-        results = client.download_attachments(
-            page_id,
-            resolved_output_dir,
-            download_images,
-            download_diagrams
-        )
+        if settings.MCP_TRANSPORT in ('sse', 'http'):
+            # Share the server's event loop rather than a thread per download
+            results = await client.adownload_attachments(
+                page_id,
+                resolved_output_dir,
+                download_images,
+                download_diagrams
+            )
+        else:
+            results = client.download_attachments(
+                page_id,
+                resolved_output_dir,
+                download_images,
+                download_diagrams
+            )
 
         success_count = sum(1 for r in results if r['status'] == 'success')
+        unchanged_count = sum(1 for r in results if r['status'] == 'unchanged')
 
         return {
             "status": "success",
@@ -218,17 +232,11 @@ def download_all_attachments(page_id: str, output_dir: str,
             "output_dir": output_dir,
             "total_attachments": len(results),
             "downloaded": success_count,
+            "unchanged": unchanged_count,
             "results": results
         }
-    except ValueError as e:
-        log(f"Configuration error: {str(e)}", "error")
-        return {
-            "status": "error",
-            "error": "configuration_error",
-            "message": str(e)
-        }
     except Exception as e:
-        log(f"Error downloading attachments: {str(e)}", "error")
+        log("Error downloading attachments: %s", "error", e)
         return {
             "status": "error",
             "error": "download_error",
@@ -259,8 +267,8 @@ def download_specific_attachment(page_id: str, attachment_id: str, output_path:
     # Resolve the output path for Docker environment
     resolved_output_path = resolve_output_path(output_path)
 
-    log(f"Downloading attachment {attachment_id} from page {page_id} to {output_path}")
-    log(f"Resolved path: {resolved_output_path}")
+    log("Downloading attachment %s from page %s to %s", "info", attachment_id, page_id, output_path)
+    log("Resolved path: %s", "info", resolved_output_path)
 
     try:
         client = get_confluence_client()
@@ -286,15 +294,8 @@ def download_specific_attachment(page_id: str, attachment_id: str, output_path:
             "status": "success",
             "attachment": result
         }
-    except ValueError as e:
-        log(f"Configuration error: {str(e)}", "error")
-        return {
-            "status": "error",
-            "error": "configuration_error",
-            "message": str(e)
-        }
     except Exception as e:
-        log(f"Error downloading attachment: {str(e)}", "error")
+        log("Error downloading attachment: %s", "error", e)
         return {
             "status": "error",
             "error": "download_error",
@@ -328,25 +329,25 @@ if __name__ == "__main__":
     transport = settings.MCP_TRANSPORT.lower()
 
     if transport == 'stdio':
-        log(f"Starting Confluence Attachments MCP Server with stdio transport")
-        log(f"Confluence URL: {settings.CONFLUENCE_URL}")
-        log(f"Debug mode: {'ON' if settings.MCP_DEBUG else 'OFF'}")
+        log("Starting Confluence Attachments MCP Server with stdio transport")
+        log("Confluence URL: %s", "info", settings.CONFLUENCE_URL)
+        log("Debug mode: %s", "info", 'ON' if settings.MCP_DEBUG else 'OFF')
 
         try:
             mcp.run(transport="stdio")
         except KeyboardInterrupt:
             log("Server stopped by user", "info")
         except Exception as e:
-            log(f"Server error: {e}", "error")
+            log("Server error: %s", "error", e)
             sys.exit(1)
 
     elif transport in ('sse', 'http'):
-        log(f"Starting Confluence Attachments MCP Server at http://{settings.MCP_HOST}:{settings.MCP_PORT}")
-        log(f"SSE Endpoint: http://{settings.MCP_HOST}:{settings.MCP_PORT}/sse")
-        log(f"Tools Endpoint: http://{settings.MCP_HOST}:{settings.MCP_PORT}/tools")
-        log(f"Confluence URL: {settings.CONFLUENCE_URL}")
-        log(f"Debug mode: {'ON' if settings.MCP_DEBUG else 'OFF'}")
-        log(f"Auto-reload: {'ENABLED' if settings.MCP_RELOAD else 'DISABLED'}")
+        log("Starting Confluence Attachments MCP Server at http://%s:%s", "info", settings.MCP_HOST, settings.MCP_PORT)
+        log("SSE Endpoint: http://%s:%s/sse", "info", settings.MCP_HOST, settings.MCP_PORT)
+        log("Tools Endpoint: http://%s:%s/tools", "info", settings.MCP_HOST, settings.MCP_PORT)
+        log("Confluence URL: %s", "info", settings.CONFLUENCE_URL)
+        log("Debug mode: %s", "info", 'ON' if settings.MCP_DEBUG else 'OFF')
+        log("Auto-reload: %s", "info", 'ENABLED' if settings.MCP_RELOAD else 'DISABLED')
 
         uvicorn_config = {
             "app": "confluence_mcp_server:get_application",
@@ -356,9 +357,9 @@ if __name__ == "__main__":
             "log_level": "debug" if settings.MCP_DEBUG else settings.LOG_LEVEL.lower()
         }
 
-        logger.debug(f"Uvicorn config: {uvicorn_config}")
+        logger.debug("Uvicorn config: %s", uvicorn_config)
         uvicorn.run(**uvicorn_config)
 
     else:
-        logger.error(f"Unknown transport: {transport}")
+        logger.error("Unknown transport: %s", transport)
         sys.exit(1)
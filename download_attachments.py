@@ -2,9 +2,12 @@
 """Download Confluence page attachments using the atlassian-python-api package."""
 
 import os
+import shutil
 import sys
 from atlassian import Confluence
 
+from confluence_client import DRAWIO_SUFFIX, ensure_suffix
+
 
 def resolve_output_path(path: str) -> str:
     """Resolve output path for Docker container environment.
@@ -96,7 +99,7 @@ def download_attachments(confluence_url, token, page_id, output_dir, download_im
         # Determine output path based on file type
         if is_diagram:
             # Add .drawio extension if not present
-            filename = title if title.endswith('.drawio') else f"{title}.drawio"
+            filename = ensure_suffix(title, DRAWIO_SUFFIX)
             output_path = os.path.join(diagrams_dir, filename)
         else:
             output_path = os.path.join(resolved_output_dir, title)
@@ -112,12 +115,10 @@ def download_attachments(confluence_url, token, page_id, output_dir, download_im
         response.raise_for_status()
 
         # Save to file
+        response.raw.decode_content = True
         with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(1024):
-                if chunk:
-                    f.write(chunk)
-
-        file_size = os.path.getsize(output_path)
+            shutil.copyfileobj(response.raw, f, length=1 << 16)
+            file_size = f.tell()
         print(f"Saved {title} ({file_size} bytes) to {output_path}")
 
 